@@ -0,0 +1,427 @@
+'''
+Teste de carga do dashboard: simula usuários simultâneos do app.py sem navegador
+
+Cada sessão simulada roda o app.py de verdade através do AppTest do Streamlit
+(o mesmo caminho de código do app.main) e repete as interações do usuário:
+troca do intervalo de datas, botão de previsão e seleção de produtos.
+A leitura do Google Sheets é substituída por uma base sintética local,
+no mesmo formato das planilhas, para que o teste não dependa da rede.
+
+Por padrão cada sessão roda em um processo próprio, com CPU e memória medidas
+por sessão. O servidor do Streamlit roda todas as sessões como threads em um
+único processo, então este modo superestima a capacidade (as sessões usam
+núcleos diferentes em vez de disputar o mesmo GIL) e a memória de cada sessão
+inclui o interpretador inteiro.
+
+Com --serializado as sessões rodam como threads em um único processo, mas
+cada execução do app passa por uma trava, porque o AppTest não suporta
+execuções simultâneas (ele troca o Runtime global e a configuração do
+Streamlit). As execuções ficam em fila, o que dá o limite pessimista da
+latência. A carga roda duas vezes, com 1 sessão (linha de base) e com N
+sessões, e o custo por sessão é o incremento de CPU e memória sobre a linha
+de base.
+
+Uso:
+    python carga.py --sessoes 8 --iteracoes 5
+    python carga.py --sessoes 16 --atraso-leitura 0.3 --saida resultado.json
+    python carga.py --sessoes 8 --serializado
+'''
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource  # Disponível apenas em sistemas Unix
+except ImportError:
+    resource = None
+
+# Ações simuladas por sessão, na ordem em que o usuário interage com o app
+ACOES = ['carregamento', 'intervalo_datas', 'previsao', 'produtos']
+
+# Ações repetidas em regime, sem o carregamento inicial (imports a frio)
+ACOES_REGIME = ACOES[1:]
+
+PERCENTIS = [50, 95, 99]
+
+JANELAS = ['inicio', 'fim', 'inicio_regime', 'fim_regime']
+
+
+# Função para gerar a base sintética no mesmo formato das planilhas
+def gerar_base_sintetica(dias=365, produtos=20, vendas_por_dia=40, semente=42):
+    rng = np.random.default_rng(semente)
+
+    ids = np.arange(1, produtos + 1)
+    precos = rng.uniform(2, 40, produtos).round(2)
+    pesos = rng.uniform(0.1, 3, produtos).round(2)
+    df_produtos = pd.DataFrame({
+        'ID_PRODUTO': ids,
+        'NOME_PRODUTO': [f'Produto {i:02d}' for i in ids],
+        # As planilhas usam vírgula como separador decimal
+        'PREÇO_KG': [f'{p:.2f}'.replace('.', ',') for p in precos],
+        'PESO_MEDIO_UNITARIO_KG': [f'{p:.2f}'.replace('.', ',') for p in pesos],
+    })
+
+    datas = pd.date_range(end=pd.Timestamp.today().normalize(), periods=dias, freq='D')
+    total = dias * vendas_por_dia
+    df_vendas = pd.DataFrame({
+        'DATA': np.repeat(datas.strftime('%m/%d/%Y'), vendas_por_dia),
+        'ID_PRODUTO': rng.choice(ids, total),
+        'VALOR_VENDA': [f'{v:.2f}'.replace('.', ',') for v in rng.uniform(1, 200, total)],
+    })
+
+    return df_produtos, df_vendas
+
+
+# Função para substituir a leitura do Google Sheets pela base sintética
+def instalar_base_sintetica(base, atraso_leitura=0.0):
+    import model
+
+    df_produtos, df_vendas = base
+
+    def ler_dados_locais():
+        # Simula a latência da leitura remota, se configurada
+        if atraso_leitura:
+            time.sleep(atraso_leitura)
+        # tratar_dados altera as colunas, então cada leitura recebe uma cópia
+        return df_produtos.copy(), df_vendas.copy()
+
+    model.ler_dados_gs = ler_dados_locais
+
+
+# Função para preparar o processo que vai executar as sessões
+def preparar_processo(parametros):
+    import streamlit.config
+    import streamlit.logger
+
+    # Silencia os avisos repetidos do Streamlit e do sklearn para deixar só o relatório.
+    # O AppTest reaplica a configuração a cada execução, por isso o nível vai também na config
+    streamlit.config.set_option('logger.level', 'error')
+    streamlit.logger.set_log_level('error')
+    warnings.filterwarnings('ignore', category=DeprecationWarning, module=r'streamlit(\.|$)')
+    warnings.filterwarnings('ignore', category=UserWarning, module=r'sklearn(\.|$)')
+
+    instalar_base_sintetica(parametros['base'], parametros['atraso_leitura'])
+
+
+# Função para medir o pico de memória do processo em MB
+def memoria_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    if sys.platform == 'darwin':
+        return pico / (1024 * 1024)
+    return pico / 1024
+
+
+# Função para medir a memória residente atual do processo em MB
+def memoria_atual_mb():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            paginas = int(arquivo.read().split()[1])
+    except OSError:
+        return None
+    return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+# Função que executa uma sessão simulada do dashboard
+def executar_sessao(indice, parametros, trava=None):
+    from streamlit.testing.v1 import AppTest
+
+    trava = trava or nullcontext()
+
+    rng = random.Random(parametros['semente'] + indice)
+
+    # Espalha o início das sessões ao longo da rampa
+    time.sleep(parametros['rampa'] * indice / parametros['sessoes'])
+
+    latencias = {acao: [] for acao in ACOES}
+    erros = []
+    # Início e fim das interações, no total e só em regime, para o cálculo da vazão
+    janela = {'inicio': None, 'fim': None, 'inicio_regime': None, 'fim_regime': None}
+
+    def medir(acao, interacao):
+        # Qualquer falha (timeout, página diferente do esperado) encerra só esta sessão.
+        # A latência inclui a espera na trava, que é a fila vista pelo usuário
+        inicio = time.time()
+        t0 = time.perf_counter()
+        try:
+            with trava:
+                at = interacao()
+        except Exception as erro:
+            at = erro
+        latencias[acao].append(time.perf_counter() - t0)
+        fim = time.time()
+
+        janela['inicio'] = janela['inicio'] or inicio
+        janela['fim'] = fim
+        if acao in ACOES_REGIME:
+            janela['inicio_regime'] = janela['inicio_regime'] or inicio
+            janela['fim_regime'] = fim
+
+        if isinstance(at, Exception):
+            erros.append({'acao': acao, 'erro': f'{type(at).__name__}: {at}'})
+            return None
+        if at.exception:
+            erros.append({'acao': acao, 'erro': at.exception[0].message})
+            return None
+        return at
+
+    def trocar_intervalo():
+        # Escolhe um novo intervalo de datas dentro do período disponível
+        data_min = at.sidebar.date_input[0].min
+        data_max = at.sidebar.date_input[1].max
+        dias = (data_max - data_min).days
+        inicio_intervalo = data_min + timedelta(days=rng.randint(0, dias // 2))
+        fim_intervalo = inicio_intervalo + timedelta(days=rng.randint(7, max(dias // 2, 7)))
+        at.sidebar.date_input[0].set_value(inicio_intervalo)
+        at.sidebar.date_input[1].set_value(min(fim_intervalo, data_max))
+        return at.run()
+
+    def selecionar_produtos():
+        # Seleciona alguns produtos na aba de análise
+        multiselect = at.multiselect[0]
+        quantidade = min(parametros['produtos_selecionados'], len(multiselect.options))
+        return multiselect.set_value(rng.sample(multiselect.options, quantidade)).run()
+
+    at = medir('carregamento', AppTest.from_file(parametros['app'], default_timeout=parametros['timeout']).run)
+
+    for _ in range(parametros['iteracoes']):
+        if at is None:
+            break
+        at = medir('intervalo_datas', trocar_intervalo)
+        if at is None:
+            break
+        at = medir('previsao', lambda: at.sidebar.button[0].click().run())
+        if at is None:
+            break
+        at = medir('produtos', selecionar_produtos)
+
+    return {
+        'sessao': indice,
+        'latencias': latencias,
+        **janela,
+        'duracao_s': janela['fim'] - janela['inicio'],
+        'erros': erros,
+    }
+
+
+# Função que executa N sessões como threads em um único processo, com as execuções do app em fila
+def executar_serializado(parametros, sessoes):
+    preparar_processo(parametros)
+    parametros = dict(parametros, sessoes=sessoes)
+    trava = threading.Lock()
+
+    memoria_inicial = memoria_atual_mb()
+    cpu_inicial = time.process_time()
+    with ThreadPoolExecutor(max_workers=sessoes) as executor:
+        resultados = list(executor.map(lambda i: executar_sessao(i, parametros, trava), range(sessoes)))
+
+    return {
+        'resultados': resultados,
+        'cpu_s': time.process_time() - cpu_inicial,
+        'memoria_inicial_mb': memoria_inicial,
+        'memoria_pico_mb': memoria_pico_mb(),
+    }
+
+
+# Função que executa uma sessão em um processo próprio
+def executar_sessao_isolada(argumentos):
+    indice, parametros = argumentos
+    preparar_processo(parametros)
+
+    memoria_inicial = memoria_atual_mb()
+    cpu_inicial = time.process_time()
+    resultado = executar_sessao(indice, parametros)
+    resultado.update({
+        'cpu_s': time.process_time() - cpu_inicial,
+        'memoria_inicial_mb': memoria_inicial,
+        'memoria_pico_mb': memoria_pico_mb(),
+    })
+    return resultado
+
+
+# Função para rodar o modo serializado em um processo novo, para medir memória de forma limpa
+def medir_serializado(parametros, sessoes):
+    with multiprocessing.Pool(processes=1) as pool:
+        return pool.apply(executar_serializado, (parametros, sessoes))
+
+
+# Função para calcular os percentis de uma lista de latências
+def calcular_percentis(valores):
+    if not valores:
+        return {f'p{p}': None for p in PERCENTIS}
+    return {f'p{p}': float(np.percentile(valores, p)) for p in PERCENTIS}
+
+
+# Função para consolidar as latências e a vazão das sessões
+def resumir_resultados(resultados):
+    latencias = {'regime': calcular_percentis(
+        [v for r in resultados for acao in ACOES_REGIME for v in r['latencias'][acao]]
+    )}
+    for acao in ACOES:
+        latencias[acao] = calcular_percentis([v for r in resultados for v in r['latencias'][acao]])
+
+    def calcular_janela(inicio, fim):
+        inicios = [r[inicio] for r in resultados if r[inicio] is not None]
+        fins = [r[fim] for r in resultados if r[fim] is not None]
+        return max(fins) - min(inicios) if inicios and fins else None
+
+    # Vazão total: do início da primeira interação de qualquer sessão ao fim da última
+    # (inclui a rampa e os carregamentos a frio). Vazão em regime: do início da primeira
+    # interação em regime ao fim da última, contando só as interações em regime
+    janela = calcular_janela('inicio', 'fim')
+    janela_regime = calcular_janela('inicio_regime', 'fim_regime')
+    interacoes = sum(len(r['latencias'][acao]) for r in resultados for acao in ACOES)
+    interacoes_regime = sum(len(r['latencias'][acao]) for r in resultados for acao in ACOES_REGIME)
+
+    return {
+        'sessoes': len(resultados),
+        'interacoes': interacoes,
+        'janela_s': janela,
+        'janela_regime_s': janela_regime,
+        'vazao_interacoes_s': interacoes / janela if janela else None,
+        'vazao_regime_s': interacoes_regime / janela_regime if janela_regime else None,
+        'erros': sum(len(r['erros']) for r in resultados),
+        'latencia_s': latencias,
+        'por_sessao': [
+            {chave: valor for chave, valor in r.items() if chave not in ('latencias',) + tuple(JANELAS)}
+            for r in resultados
+        ],
+    }
+
+
+# Função para calcular o custo de cada sessão adicional sobre a linha de base
+def calcular_incremento(linha_base, carga, sessoes):
+    def incremento(chave):
+        if sessoes < 2 or linha_base[chave] is None or carga[chave] is None:
+            return None
+        return (carga[chave] - linha_base[chave]) / (sessoes - 1)
+
+    return {'cpu_s': incremento('cpu_s'), 'memoria_pico_mb': incremento('memoria_pico_mb')}
+
+
+def fmt(valor, sufixo=''):
+    return '-' if valor is None else f'{valor:.3f}{sufixo}'
+
+
+# Função para exibir o resumo no terminal
+def exibir_resumo(resumo):
+    print(f"\nModo: {resumo['modo']}")
+    if resumo['modo'] == 'processos':
+        print("ATENÇÃO: um processo por sessão superestima a capacidade do servidor do Streamlit "
+              "e a memória de cada sessão inclui o interpretador inteiro.")
+    else:
+        print("ATENÇÃO: as execuções do app ficam em fila (limite pessimista); "
+              "a latência inclui a espera pelas outras sessões.")
+
+    print(f"\nSessões: {resumo['sessoes']}  Interações: {resumo['interacoes']}  Erros: {resumo['erros']}")
+    print(f"Vazão: {fmt(resumo['vazao_interacoes_s'], ' int/s')} em {fmt(resumo['janela_s'], 's')}  "
+          f"Vazão em regime: {fmt(resumo['vazao_regime_s'], ' int/s')} em {fmt(resumo['janela_regime_s'], 's')}")
+
+    print(f"\n{'Ação':<16}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+    for acao, percentis in resumo['latencia_s'].items():
+        print(f"{acao:<16}" + ''.join(f"{fmt(percentis[f'p{p}']):>10}" for p in PERCENTIS))
+    print("(regime = todas as ações exceto o carregamento inicial, que inclui imports a frio)")
+
+    if resumo['modo'] == 'serializado':
+        print(f"\n{'Processo':<24}{'CPU (s)':>10}{'Mem. início (MB)':>18}{'Mem. pico (MB)':>16}")
+        for rotulo, chave in [('Linha de base (1)', 'linha_base'), (f"Carga ({resumo['sessoes']})", 'carga')]:
+            processo = resumo['processo'][chave]
+            if processo is not None:
+                print(f"{rotulo:<24}{fmt(processo['cpu_s']):>10}"
+                      f"{fmt(processo['memoria_inicial_mb']):>18}{fmt(processo['memoria_pico_mb']):>16}")
+        incremento = resumo['processo']['incremento_por_sessao']
+        print(f"{'Incremento por sessão':<24}{fmt(incremento['cpu_s']):>10}"
+              f"{'':>18}{fmt(incremento['memoria_pico_mb']):>16}")
+
+    # CPU e memória por sessão só existem no modo processos; no serializado vale o incremento acima
+    por_processo = resumo['modo'] == 'processos'
+    colunas = f"{'CPU (s)':>10}{'Mem. pico (MB)':>16}" if por_processo else ''
+    print(f"\n{'Sessão':<8}{'Duração (s)':>13}{colunas}{'Erros':>7}")
+    for sessao in resumo['por_sessao']:
+        colunas = f"{fmt(sessao['cpu_s']):>10}{fmt(sessao['memoria_pico_mb']):>16}" if por_processo else ''
+        print(f"{sessao['sessao']:<8}{sessao['duracao_s']:>13.2f}{colunas}{len(sessao['erros']):>7}")
+        for erro in sessao['erros']:
+            print(f"    {erro['acao']}: {erro['erro']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do dashboard Feira Analytics.')
+    parser.add_argument('--sessoes', type=int, default=4, help='Número de sessões simultâneas')
+    parser.add_argument('--iteracoes', type=int, default=3, help='Ciclos de interação por sessão')
+    parser.add_argument('--rampa', type=float, default=0.0, help='Segundos para iniciar todas as sessões')
+    parser.add_argument('--dias', type=int, default=365, help='Dias na base sintética')
+    parser.add_argument('--produtos', type=int, default=20, help='Produtos na base sintética')
+    parser.add_argument('--vendas-por-dia', type=int, default=40, help='Vendas por dia na base sintética')
+    parser.add_argument('--produtos-selecionados', type=int, default=3, help='Produtos escolhidos no multiselect')
+    parser.add_argument('--atraso-leitura', type=float, default=0.0, help='Latência simulada por leitura da base (s)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Tempo máximo por execução do app (s)')
+    parser.add_argument('--semente', type=int, default=42, help='Semente dos dados e das interações')
+    parser.add_argument('--app', default='app.py', help='Script do Streamlit a ser testado')
+    parser.add_argument('--serializado', action='store_true',
+                        help='Sessões como threads em um processo, com as execuções do app em fila')
+    parser.add_argument('--saida', help='Arquivo JSON para salvar o resultado completo')
+    args = parser.parse_args()
+
+    # Validação dos parâmetros numéricos
+    for nome in ['sessoes', 'iteracoes', 'dias', 'produtos', 'vendas_por_dia', 'produtos_selecionados', 'timeout']:
+        if getattr(args, nome) <= 0:
+            parser.error(f"--{nome.replace('_', '-')} deve ser maior que zero")
+    for nome in ['rampa', 'atraso_leitura']:
+        if getattr(args, nome) < 0:
+            parser.error(f"--{nome.replace('_', '-')} não pode ser negativo")
+
+    parametros = {
+        'sessoes': args.sessoes,
+        'iteracoes': args.iteracoes,
+        'rampa': args.rampa,
+        'produtos_selecionados': args.produtos_selecionados,
+        'atraso_leitura': args.atraso_leitura,
+        'timeout': args.timeout,
+        'semente': args.semente,
+        'app': args.app,
+        'base': gerar_base_sintetica(args.dias, args.produtos, args.vendas_por_dia, args.semente),
+    }
+
+    if args.serializado:
+        # Linha de base com 1 sessão, depois a carga com N sessões, cada uma em um processo novo
+        linha_base = medir_serializado(parametros, 1) if args.sessoes > 1 else None
+        carga = medir_serializado(parametros, args.sessoes)
+        linha_base = linha_base or carga
+        resumo = dict(modo='serializado', **resumir_resultados(carga['resultados']))
+        resumo['processo'] = {
+            'linha_base': {chave: valor for chave, valor in linha_base.items() if chave != 'resultados'},
+            'carga': {chave: valor for chave, valor in carga.items() if chave != 'resultados'},
+            'incremento_por_sessao': calcular_incremento(linha_base, carga, args.sessoes),
+        }
+    else:
+        with multiprocessing.Pool(processes=args.sessoes, maxtasksperchild=1) as pool:
+            resultados = pool.map(executar_sessao_isolada, [(i, parametros) for i in range(args.sessoes)], chunksize=1)
+        resumo = dict(modo='processos', **resumir_resultados(resultados))
+
+    exibir_resumo(resumo)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResultado salvo em {args.saida}")
+
+    # Código de saída diferente de zero se alguma sessão falhou
+    return 1 if resumo['erros'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())